@@ -0,0 +1,211 @@
+"""
+LLM Hedged Requests - Shared by the Python Demos
+If the first request is slower than the recent latency percentile, a second
+one is sent (optionally to a fallback model) and the first success wins
+
+Creator: Sabilashan Ganeshan
+GitHub: https://github.com/sabilashang
+
+Both the note summarizer and the model evaluator import this module, so when
+they run in one process (serve.py) they share one thread pool, one latency
+window and one set of counters, and the hedge rate cap applies to both.
+"""
+
+import os
+import time
+import socket
+import threading
+import requests
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+# Load environment variables
+# Use absolute path to .env file (works regardless of where script is run from)
+env_path = os.path.join(os.path.dirname(__file__), '.env')
+load_dotenv(dotenv_path=env_path)
+
+# Hedging configuration - set LLM_HEDGE_MAX_RATE=0 to disable
+FALLBACK_MODELS = [m.strip() for m in os.getenv('FALLBACK_MODELS', '').split(',') if m.strip()]
+LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '95'))
+LLM_HEDGE_DELAY = float(os.getenv('LLM_HEDGE_DELAY', '10'))  # until enough latencies are known
+LLM_HEDGE_MAX_RATE = float(os.getenv('LLM_HEDGE_MAX_RATE', '0.1'))
+LLM_HEDGE_MIN_SAMPLES = 20
+LLM_TIMEOUT = 60
+
+hedge_executor = ThreadPoolExecutor(max_workers=32)
+hedge_lock = threading.Lock()
+hedge_latencies = deque(maxlen=200)  # latencies of primary requests
+hedge_stats = {'requests': 0, 'hedges': 0, 'primary_wins': 0, 'hedge_wins': 0}
+
+
+def hedge_delay():
+    """Seconds to wait before hedging: the configured percentile of recent latencies"""
+    with hedge_lock:
+        latencies = sorted(hedge_latencies)
+    if len(latencies) < LLM_HEDGE_MIN_SAMPLES:
+        return LLM_HEDGE_DELAY
+    index = min(len(latencies) - 1, int(len(latencies) * LLM_HEDGE_PERCENTILE / 100))
+    return latencies[index]
+
+
+def reserve_hedge():
+    """Count a hedge if it stays within LLM_HEDGE_MAX_RATE of all requests
+
+    Returns the hedge's sequence number, or 0 when the budget is used up.
+    """
+    with hedge_lock:
+        if hedge_stats['hedges'] + 1 > hedge_stats['requests'] * LLM_HEDGE_MAX_RATE:
+            return 0
+        hedge_stats['hedges'] += 1
+        return hedge_stats['hedges']
+
+
+def get_hedge_stats():
+    """Hedging counters plus the current hedge delay and hedge rate"""
+    with hedge_lock:
+        stats = dict(hedge_stats)
+    stats['hedge_rate'] = round(stats['hedges'] / stats['requests'], 4) if stats['requests'] else 0
+    stats['hedge_delay'] = round(hedge_delay(), 3)
+    return stats
+
+
+class AbortableAdapter(HTTPAdapter):
+    """Transport adapter for one request attempt that another thread can abort
+
+    It keeps the connections it opens, so abort() can shut down the socket of
+    a request that is still waiting for its response.
+    """
+
+    def __init__(self):
+        self.connections = []
+        self.aborted = False
+        self.started = None  # set once the request actually starts
+        super().__init__()
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        adapter = self
+
+        def tracked(pool_class):
+            class TrackedPool(pool_class):
+                def _new_conn(self):
+                    if adapter.aborted:
+                        raise requests.exceptions.ConnectionError('Request aborted')
+                    conn = super()._new_conn()
+                    adapter.connections.append(conn)
+                    return conn
+            return TrackedPool
+
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: tracked(pool_class)
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()}
+
+    def abort(self):
+        """Shut down the attempt's connections; its request fails right away"""
+        self.aborted = True
+        for conn in self.connections:
+            if getattr(conn, 'sock', None) is not None:
+                try:
+                    conn.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass  # already closed
+
+
+def timed_post(url, headers, payload, adapter):
+    """POST to the API through `adapter` and return the response with its latency
+
+    The latency is measured from when the request starts, so time spent
+    queued for a pool thread is not counted.
+    """
+    adapter.started = time.monotonic()
+    with requests.Session() as session:
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        response = session.post(url, headers=headers, json=payload, timeout=LLM_TIMEOUT)
+    return response, time.monotonic() - adapter.started
+
+
+def record_latency(latency):
+    """Add a primary request's latency to the window used for the hedge delay"""
+    with hedge_lock:
+        hedge_latencies.append(latency)
+
+
+def discard_response(future):
+    """Close the connection of a request that lost the race"""
+    if not future.cancelled() and future.exception() is None:
+        future.result()[0].close()
+
+
+def post_with_hedging(url, headers, payload):
+    """POST to the API, hedging slow requests; returns the first successful response
+
+    If nothing succeeds, the first failed response is returned (or the first
+    request error raised) so callers can report it as before.
+    """
+    with hedge_lock:
+        hedge_stats['requests'] += 1
+
+    def submit(attempt_payload):
+        adapter = AbortableAdapter()
+        future = hedge_executor.submit(timed_post, url, headers, attempt_payload, adapter)
+        return future, adapter
+
+    primary, primary_adapter = submit(payload)
+    attempts = {primary: ('primary', primary_adapter)}
+    deadline = time.monotonic() + hedge_delay()
+    hedged = False
+    failures = []
+
+    while attempts:
+        timeout = None if hedged else max(0, deadline - time.monotonic())
+        done, _ = wait(attempts, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            role, _ = attempts.pop(future)
+            try:
+                response, elapsed = future.result()
+            except requests.exceptions.RequestException as e:
+                failures.append(e)
+                continue
+            if not response.ok:
+                failures.append(response)
+                continue
+
+            # Only successful primaries count - fast failures would pull the delay down
+            if role == 'primary':
+                record_latency(elapsed)
+
+            # First success wins - abort the other request and drop its response
+            for other, (other_role, adapter) in attempts.items():
+                other.cancel()
+                adapter.abort()
+                other.add_done_callback(discard_response)
+                # The aborted primary ran at least this long
+                if other_role == 'primary' and adapter.started is not None:
+                    record_latency(time.monotonic() - adapter.started)
+            with hedge_lock:
+                hedge_stats[f'{role}_wins'] += 1
+            return response
+
+        # Hedge when the primary is slow, or as soon as it has failed with a
+        # transient error (other 4xx responses would just fail again)
+        primary_failed = not attempts and (
+            isinstance(failures[-1], Exception)
+            or failures[-1].status_code >= 500 or failures[-1].status_code == 429)
+        if not hedged and (not done or primary_failed):
+            hedged = True
+            hedge_number = reserve_hedge()
+            if hedge_number:
+                hedge_payload = dict(payload)
+                if FALLBACK_MODELS:
+                    hedge_payload['model'] = FALLBACK_MODELS[
+                        (hedge_number - 1) % len(FALLBACK_MODELS)]
+                hedge, hedge_adapter = submit(hedge_payload)
+                attempts[hedge] = ('hedge', hedge_adapter)
+
+    if isinstance(failures[0], Exception):
+        raise failures[0]
+    return failures[0]
@@ -9,7 +9,7 @@ GitHub: https://github.com/sabilashang
 import os
 import json
 import requests
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import Blueprint, Flask, request, jsonify, send_file, render_template
 from flask_cors import CORS
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
@@ -20,17 +20,15 @@ import io
 env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 load_dotenv(dotenv_path=env_path)
 
-app = Flask(__name__)
-CORS(app)
+# Routes live on a blueprint so serve.py can mount this app alongside the others
+bp = Blueprint('cleaner', __name__, template_folder='templates')
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
+UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
 ALLOWED_EXTENSIONS = {'csv'}
+MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-
 # OpenRouter API Configuration - All values from .env only
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
 OPENROUTER_API_URL = os.getenv('OPENROUTER_API_URL')
@@ -104,13 +102,13 @@ def call_openrouter_api(prompt, csv_content):
         raise Exception(f"Unexpected API response format: {str(e)}")
 
 
-@app.route('/')
+@bp.route('/')
 def index():
     """Main page with file upload form"""
-    return render_template('index.html')
+    return render_template('cleaner/index.html')
 
 
-@app.route('/clean', methods=['POST'])
+@bp.route('/clean', methods=['POST'])
 def clean_csv():
     """Clean uploaded CSV file using LLM"""
 
@@ -180,6 +178,14 @@ def clean_csv():
         }), 500
 
 
+# Standalone app (python app.py)
+app = Flask(__name__, static_folder=None)
+CORS(app)
+app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+app.register_blueprint(bp)
+
+
 if __name__ == '__main__':
     print("🚀 ML Data Cleaning Demo starting...")
     print(f"📡 API Endpoint: {OPENROUTER_API_URL}")
@@ -7,25 +7,53 @@ GitHub: https://github.com/sabilashang
 """
 
 import os
+import re
+import sys
 import json
+import hashlib
+import threading
+import time
 import requests
-from flask import Flask, render_template, request, jsonify
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, Flask, Response, render_template, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
+from prompt_builder import build_evaluation_prompt
 
 # Load environment variables
 # Use absolute path to .env file (works regardless of where script is run from)
 env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 load_dotenv(dotenv_path=env_path)
 
-app = Flask(__name__)
-CORS(app)
+# Hedged requests are shared with the summarizer (llm_hedging.py in the repo root)
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from llm_hedging import get_hedge_stats, post_with_hedging  # noqa: E402
+
+# Routes live on a blueprint so serve.py can mount this app alongside the others
+bp = Blueprint('evaluator', __name__, template_folder='templates')
 
 # OpenRouter API Configuration - All values from .env only
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
 OPENROUTER_API_URL = os.getenv('OPENROUTER_API_URL')
 DEFAULT_MODEL = os.getenv('DEFAULT_MODEL')
 
+# Background LLM analysis - metrics are returned right away and the analysis
+# is delivered later via polling or SSE. Analysis jobs are stored on disk,
+# keyed by dataset content hash and model, so they are shared by all worker
+# processes and finished analyses are never requested twice.
+ANALYSIS_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'analysis_cache')
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', '4'))
+ANALYSIS_STALE_SECONDS = 300
+ANALYSIS_ID_PATTERN = re.compile(r'[0-9a-f]{64}')
+os.makedirs(ANALYSIS_CACHE_DIR, exist_ok=True)
+
+analysis_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS)
+analysis_done = threading.Condition()
+analysis_running = set()  # analysis ids started by this process
+
 
 def load_sample_results(filename='sample_results.json'):
     """Load sample model results from JSON file"""
@@ -76,9 +104,12 @@ def calculate_metrics(predictions, true_labels):
     false_negatives = sum(1 for pred, true in zip(
         predictions, true_labels) if pred == 0 and true == 1)
 
-    total = len(predictions)
+    return metrics_from_counts(true_positives, true_negatives,
+                               false_positives, false_negatives, len(predictions))
 
-    # Calculate metrics
+
+def metrics_from_counts(true_positives, true_negatives, false_positives, false_negatives, total):
+    """Calculate accuracy, precision, recall, and F1 score from confusion matrix counts"""
     accuracy = (true_positives + true_negatives) / total if total > 0 else 0
 
     precision = true_positives / \
@@ -105,7 +136,80 @@ def calculate_metrics(predictions, true_labels):
     }
 
 
-def call_openrouter_api(prompt, data):
+def calculate_slice_metrics(predictions, true_labels, attributes, crosses=()):
+    """Calculate metrics for every attribute value and attribute cross
+
+    Each attribute and each cross is one counting pass over the samples.
+
+    `attributes` maps an attribute name to its per-sample values, `crosses` lists
+    attribute name combinations (e.g. ["region", "plan"]) to slice jointly.
+    Slices are returned worst F1 first; slices where F1 is undefined
+    (f1_score is None) come after them, worst accuracy first.
+    """
+    if len(predictions) != len(true_labels):
+        raise ValueError(
+            "Predictions and true_labels must have the same length")
+    if not isinstance(attributes, dict) or not all(
+            isinstance(values, list) for values in attributes.values()):
+        raise ValueError("attributes must map attribute names to lists of values")
+    if not isinstance(crosses, (list, tuple)) or not all(
+            isinstance(cross, list) and all(isinstance(name, str) for name in cross)
+            for cross in crosses):
+        raise ValueError("slice_crosses must be a list of lists of attribute names")
+
+    groupings = [(name,) for name in attributes] + [tuple(c) for c in crosses]
+    for grouping in groupings:
+        for name in grouping:
+            if name not in attributes:
+                raise ValueError(f"Unknown slice attribute: {name}")
+            if len(attributes[name]) != len(predictions):
+                raise ValueError(
+                    f"Attribute '{name}' must have one value per prediction")
+    columns = [[attributes[name] for name in grouping] for grouping in groupings]
+
+    # Confusion matrix cell of each sample, computed once:
+    # 0 = TP, 1 = TN, 2 = FP, 3 = FN, None = other labels
+    cell_lookup = {(1, 1): 0, (0, 0): 1, (1, 0): 2, (0, 1): 3}.get
+    cells = list(map(cell_lookup, zip(predictions, true_labels)))
+
+    # One C-level Counter pass per grouping over (cell, *attribute values),
+    # then fold the cells into a [TP, TN, FP, FN, total] row per slice
+    counts = {}
+    for grouping, cols in zip(groupings, columns):
+        try:
+            grouped = Counter(zip(cells, *cols))
+        except TypeError:
+            raise ValueError(
+                f"Values of {' & '.join(grouping)} must be strings or numbers")
+        for (cell, *values), count in grouped.items():
+            key = (grouping, tuple(values))
+            row = counts.get(key)
+            if row is None:
+                row = counts[key] = [0, 0, 0, 0, 0]
+            if cell is not None:
+                row[cell] += count
+            row[4] += count
+
+    slices = []
+    for (grouping, values), row in counts.items():
+        slice_attributes = dict(zip(grouping, values))
+        metrics = metrics_from_counts(*row)
+        # F1 is undefined without positive labels or positive predictions
+        if metrics['true_positives'] + metrics['false_positives'] + metrics['false_negatives'] == 0:
+            metrics['f1_score'] = None
+        slices.append({
+            'slice': ' & '.join(f'{name}={value}' for name, value in slice_attributes.items()),
+            'attributes': slice_attributes,
+            **metrics
+        })
+
+    # Worst F1 first; slices without an F1 follow, worst accuracy first
+    slices.sort(key=lambda m: (m['f1_score'] is None, m['f1_score'] or 0,
+                               m['accuracy'], -m['total_samples']))
+    return slices
+
+
+def call_openrouter_api(prompt):
     """Call OpenRouter API for model evaluation"""
     try:
         headers = {
@@ -115,18 +219,14 @@ def call_openrouter_api(prompt, data):
             'X-Title': 'ML Model Evaluation Demo'
         }
 
-        data_str = json.dumps(data, indent=2)
-        full_prompt = f"{prompt}\n\nModel Results:\n{data_str}\n\nProvide a comprehensive evaluation summary."
-
         payload = {
             'model': DEFAULT_MODEL,
             'messages': [
-                {'role': 'user', 'content': full_prompt}
+                {'role': 'user', 'content': prompt}
             ]
         }
 
-        response = requests.post(
-            OPENROUTER_API_URL, headers=headers, json=payload, timeout=60)
+        response = post_with_hedging(OPENROUTER_API_URL, headers, payload)
 
         # Check for errors and provide detailed error message
         if not response.ok:
@@ -162,13 +262,138 @@ def call_openrouter_api(prompt, data):
         raise Exception(f"Unexpected API response format: {str(e)}")
 
 
-@app.route('/')
+def analysis_id_for(results):
+    """Cache key for an analysis: hash of the dataset content and the model"""
+    content = json.dumps(results, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(f"{DEFAULT_MODEL}:{content}".encode('utf-8')).hexdigest()
+
+
+def analysis_cache_path(analysis_id):
+    """Path of the stored analysis job for an analysis id"""
+    return os.path.join(ANALYSIS_CACHE_DIR, f'{analysis_id}.json')
+
+
+def claim_analysis(analysis_id):
+    """Atomically claim an analysis for this process via an exclusive lock file
+
+    Returns False if another worker process already holds the claim. A claim
+    older than ANALYSIS_STALE_SECONDS belongs to a worker that went away and
+    is taken over.
+    """
+    lock_path = f'{analysis_cache_path(analysis_id)}.lock'
+    for _ in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) <= ANALYSIS_STALE_SECONDS:
+                    return False
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass  # released meanwhile - try again
+    return False
+
+
+def release_analysis(analysis_id):
+    """Drop this process's claim once the analysis outcome is stored"""
+    try:
+        os.remove(f'{analysis_cache_path(analysis_id)}.lock')
+    except FileNotFoundError:
+        pass
+
+
+def get_analysis(analysis_id):
+    """Return the job for an analysis id (pending, done or error), or None"""
+    # Ids come from the URL - only well-formed hashes may become file names
+    if not ANALYSIS_ID_PATTERN.fullmatch(analysis_id):
+        return None
+    try:
+        with open(analysis_cache_path(analysis_id), 'r', encoding='utf-8') as f:
+            job = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    # A pending job whose worker went away is reported as failed so it is retried
+    if job.get('status') == 'pending' and time.time() - job.get('started', 0) > ANALYSIS_STALE_SECONDS:
+        return {'status': 'error', 'error': 'Analysis did not finish in time'}
+    return job
+
+
+def save_analysis(analysis_id, job):
+    """Store an analysis job on disk so every worker process can see it"""
+    path = analysis_cache_path(analysis_id)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(job, f)
+    os.replace(tmp_path, path)
+
+
+def run_analysis(analysis_id, prompt):
+    """Call the LLM in the background and store the outcome"""
+    try:
+        job = {'status': 'done', 'analysis': call_openrouter_api(prompt)}
+    except Exception as e:
+        job = {'status': 'error', 'error': str(e)}
+
+    save_analysis(analysis_id, job)
+    release_analysis(analysis_id)
+    with analysis_done:
+        analysis_running.discard(analysis_id)
+        analysis_done.notify_all()
+
+
+def start_analysis(analysis_id, prompt):
+    """Start an analysis unless it is already cached or running (failed ones are retried)
+
+    Only the worker process that wins the claim calls the LLM; the others
+    report the job as pending and pick up the stored outcome.
+    """
+    with analysis_done:
+        job = get_analysis(analysis_id)
+        if job and job['status'] != 'error':
+            return job
+        if not claim_analysis(analysis_id):
+            job = get_analysis(analysis_id)
+            if job and job['status'] != 'error':
+                return job
+            return {'status': 'pending', 'started': time.time()}
+        job = {'status': 'pending', 'started': time.time()}
+        save_analysis(analysis_id, job)
+        analysis_running.add(analysis_id)
+    analysis_executor.submit(run_analysis, analysis_id, prompt)
+    return job
+
+
+def finish_analyses(timeout):
+    """Wait up to `timeout` seconds for this process's analyses before shutdown
+
+    Analyses still unfinished are stored as failed, so they are not left
+    pending on disk and the next /evaluate retries them.
+    """
+    deadline = time.monotonic() + timeout
+    with analysis_done:
+        while analysis_running and deadline > time.monotonic():
+            analysis_done.wait(deadline - time.monotonic())
+        unfinished = list(analysis_running)
+
+    for analysis_id in unfinished:
+        save_analysis(analysis_id, {
+            'status': 'error',
+            'error': 'Server shut down before the analysis finished'
+        })
+        release_analysis(analysis_id)
+    analysis_executor.shutdown(wait=False)
+    return unfinished
+
+
+@bp.route('/')
 def index():
     """Main page"""
-    return render_template('index.html')
+    return render_template('evaluator/index.html')
 
 
-@app.route('/datasets', methods=['GET'])
+@bp.route('/datasets', methods=['GET'])
 def get_datasets():
     """Get list of available datasets"""
     try:
@@ -184,7 +409,7 @@ def get_datasets():
         }), 500
 
 
-@app.route('/evaluate', methods=['POST'])
+@bp.route('/evaluate', methods=['POST'])
 def evaluate():
     """Evaluate model results"""
     try:
@@ -213,37 +438,45 @@ def evaluate():
         # Calculate metrics from predictions and true labels
         metrics = calculate_metrics(predictions, true_labels)
 
+        # Per-segment metrics when the results carry per-sample attributes
+        slices = None
+        attributes = results.get('attributes')
+        if attributes:
+            crosses = data.get('slice_crosses', results.get('slice_crosses', []))
+            try:
+                slices = calculate_slice_metrics(
+                    predictions, true_labels, attributes, crosses)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+
         accuracy = metrics['accuracy']
         precision = metrics['precision']
         recall = metrics['recall']
         f1_score = metrics['f1_score']
 
-        # Create evaluation prompt with detailed information
-        prompt = f"""Analyze this ML model's performance:
-
-Model: {results.get('model_name', 'Unknown')}
-Dataset: {results.get('dataset', 'Unknown')}
-Total Samples: {metrics['total_samples']}
-
-Metrics:
-- Accuracy: {accuracy:.2%}
-- Precision: {precision:.2%}
-- Recall: {recall:.2%}
-- F1 Score: {f1_score:.2%}
-
-Confusion Matrix:
-- True Positives: {metrics['true_positives']}
-- True Negatives: {metrics['true_negatives']}
-- False Positives: {metrics['false_positives']}
-- False Negatives: {metrics['false_negatives']}
+        # Create a compact evaluation prompt (metrics, confusion matrix and
+        # a sample of misclassified examples instead of the full results)
+        prompt = build_evaluation_prompt(
+            """Analyze this ML model's performance.
 
 Provide a clear, concise evaluation summary explaining:
 1. Overall model performance
 2. Strengths and weaknesses based on the confusion matrix
-3. Recommendations for improvement"""
-
-        # Call API for analysis
-        analysis = call_openrouter_api(prompt, results)
+3. Recommendations for improvement""",
+            results,
+            {
+                'Accuracy': f"{accuracy:.2%}",
+                'Precision': f"{precision:.2%}",
+                'Recall': f"{recall:.2%}",
+                'F1 Score': f"{f1_score:.2%}"
+            })
+
+        # Start the LLM analysis in the background (or reuse a cached one)
+        analysis_id = analysis_id_for(results)
+        job = start_analysis(analysis_id, prompt)
 
         return jsonify({
             'success': True,
@@ -257,7 +490,11 @@ Provide a clear, concise evaluation summary explaining:
                 'false_positives': metrics['false_positives'],
                 'false_negatives': metrics['false_negatives']
             },
-            'analysis': analysis
+            'slices': slices,
+            'analysis_id': analysis_id,
+            'analysis_status': job['status'],
+            'analysis': job.get('analysis'),
+            'analysis_error': job.get('error')
         })
 
     except Exception as e:
@@ -267,6 +504,75 @@ Provide a clear, concise evaluation summary explaining:
         }), 500
 
 
+@bp.route('/api/hedging', methods=['GET'])
+def hedging_stats():
+    """Hedged request counters for the LLM calls"""
+    return jsonify({
+        'success': True,
+        'hedging': get_hedge_stats()
+    })
+
+
+@bp.route('/analysis/<analysis_id>', methods=['GET'])
+def analysis_status(analysis_id):
+    """Poll the status of a background analysis"""
+    job = get_analysis(analysis_id)
+    if not job:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown analysis id'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'analysis_id': analysis_id,
+        'status': job['status'],
+        'analysis': job.get('analysis'),
+        'error': job.get('error')
+    })
+
+
+@bp.route('/analysis/<analysis_id>/stream', methods=['GET'])
+def analysis_stream(analysis_id):
+    """Server-Sent Events stream that emits the analysis once it is ready"""
+    if not get_analysis(analysis_id):
+        return jsonify({
+            'success': False,
+            'error': 'Unknown analysis id'
+        }), 404
+
+    def events():
+        while True:
+            with analysis_done:
+                job = get_analysis(analysis_id)
+                if job and job['status'] == 'pending':
+                    # Short timeout: the job may finish in another worker process
+                    analysis_done.wait(timeout=2)
+                    job = get_analysis(analysis_id)
+            if not job or job['status'] != 'pending':
+                break
+            # Keep the connection alive while the LLM is still working
+            yield ": keepalive\n\n"
+
+        job = job or {'status': 'error', 'error': 'Unknown analysis id'}
+        payload = {
+            'analysis_id': analysis_id,
+            'status': job['status'],
+            'analysis': job.get('analysis'),
+            'error': job.get('error')
+        }
+        yield f"data: {json.dumps(payload)}\n\n"
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+
+# Standalone app (python app.py)
+app = Flask(__name__, static_folder=None)
+CORS(app)
+app.register_blueprint(bp)
+
+
 if __name__ == '__main__':
     print("🚀 ML Model Evaluation Demo starting...")
     print("✅ Server running on http://localhost:5003")
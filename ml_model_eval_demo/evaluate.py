@@ -9,8 +9,12 @@ GitHub: https://github.com/sabilashang
 import os
 import sys
 import json
+import glob
+import hashlib
 import requests
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dotenv import load_dotenv
+from prompt_builder import build_evaluation_prompt
 
 # Load environment variables
 # Use absolute path to .env file (works regardless of where script is run from)
@@ -22,6 +26,18 @@ OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
 OPENROUTER_API_URL = os.getenv('OPENROUTER_API_URL')
 DEFAULT_MODEL = os.getenv('DEFAULT_MODEL')
 
+# Comparison mode settings
+EVAL_MAX_CONCURRENCY = int(os.getenv('EVAL_MAX_CONCURRENCY', '4'))
+CACHE_FILE = '.evaluation_cache.json'
+COMPARISON_REPORT = 'comparison_report.txt'
+
+EVALUATION_PROMPT = """Given the following summary of model predictions and true labels,
+please provide a detailed evaluation that includes:
+1. Calculate the accuracy
+2. Identify any patterns in misclassifications
+3. Provide insights on model performance
+4. Suggest potential improvements"""
+
 
 def load_sample_results(filename='sample_results.json'):
     """Load sample model results from JSON file"""
@@ -38,7 +54,7 @@ def load_sample_results(filename='sample_results.json'):
         return None
 
 
-def call_openrouter_api(prompt, data):
+def call_openrouter_api(prompt):
     """Call OpenRouter API for model evaluation"""
     try:
         headers = {
@@ -46,14 +62,10 @@ def call_openrouter_api(prompt, data):
             'Content-Type': 'application/json'
         }
 
-        # Format the data as JSON string for the prompt
-        data_str = json.dumps(data, indent=2)
-        full_prompt = f"{prompt}\n\nModel Results:\n{data_str}\n\nProvide a comprehensive evaluation summary."
-
         payload = {
             'model': DEFAULT_MODEL,
             'messages': [
-                {'role': 'user', 'content': full_prompt}
+                {'role': 'user', 'content': prompt}
             ]
         }
 
@@ -93,10 +105,209 @@ def calculate_local_metrics(results):
     }
 
 
+def build_prompt(results, metrics):
+    """Build the compact LLM prompt for one results file"""
+    prompt_metrics = None
+    if metrics:
+        prompt_metrics = {
+            'Accuracy': f"{metrics['accuracy']}%",
+            'Correct Predictions': metrics['correct_predictions']
+        }
+    return build_evaluation_prompt(EVALUATION_PROMPT, results, prompt_metrics)
+
+
+def evaluation_output_path(filename):
+    """Return the per-dataset evaluation file name for a results file"""
+    base_name = filename.replace('.json', '')
+    return f'{base_name}_evaluation.txt'
+
+
+def write_evaluation_file(filename, results, metrics, evaluation):
+    """Save one evaluation summary next to its dataset name"""
+    output_file = evaluation_output_path(filename)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write("ML Model Evaluation Summary\n")
+        f.write("=" * 60 + "\n\n")
+        f.write(f"Model: {results.get('model_name', 'Unknown')}\n")
+        f.write(f"Dataset: {results.get('dataset', 'Unknown')}\n\n")
+        if metrics:
+            f.write(f"Accuracy: {metrics['accuracy']}%\n")
+            f.write(f"Total Samples: {metrics['total_samples']}\n\n")
+        f.write("LLM Analysis:\n")
+        f.write("-" * 60 + "\n")
+        f.write(evaluation)
+    return output_file
+
+
+def expand_dataset_args(args):
+    """Expand file names and glob patterns (relative to this script) into dataset files"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    filenames = []
+    for arg in args:
+        if any(ch in arg for ch in '*?['):
+            matches = sorted(glob.glob(os.path.join(base_dir, arg)))
+            if not os.path.isabs(arg):
+                matches = [os.path.relpath(m, base_dir) for m in matches]
+            filenames.extend(matches)
+        else:
+            filenames.append(arg)
+    # Keep the first occurrence of each file, in command line order
+    return list(dict.fromkeys(filenames))
+
+
+def evaluate_file(filename):
+    """Load one results file, compute its metrics and build its prompt (runs in a worker process)"""
+    sample_file = os.path.join(os.path.dirname(__file__), filename)
+    try:
+        with open(sample_file, 'rb') as f:
+            raw = f.read()
+        results = json.loads(raw)
+    except (OSError, json.JSONDecodeError) as e:
+        return {'filename': filename, 'error': str(e)}
+
+    metrics = calculate_local_metrics(results)
+    # Only send back what the report needs, not the full prediction arrays
+    return {
+        'filename': filename,
+        'digest': hashlib.sha256(raw).hexdigest(),
+        'results': {
+            'model_name': results.get('model_name', 'Unknown'),
+            'dataset': results.get('dataset', 'Unknown')
+        },
+        'metrics': metrics,
+        'prompt': build_prompt(results, metrics)
+    }
+
+
+def cache_key(entry):
+    """Cache key covering the file contents, the model and the prompt"""
+    key_source = f"{entry['digest']}:{DEFAULT_MODEL}:{entry['prompt']}"
+    return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+
+def load_evaluation_cache():
+    """Load cached evaluations from previous comparison runs"""
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_evaluation_cache(cache):
+    """Persist cached evaluations for the next comparison run"""
+    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2)
+
+
+def write_comparison_report(entries, output_file=COMPARISON_REPORT):
+    """Write one report with a metrics table and the per-model analyses"""
+    evaluated = [e for e in entries if 'error' not in e]
+    failed = [e for e in entries if 'error' in e]
+    evaluated.sort(key=lambda e: (e['metrics'] or {}).get('accuracy', -1),
+                   reverse=True)
+
+    rows = [('File', 'Model', 'Dataset', 'Samples', 'Accuracy')]
+    for entry in evaluated:
+        results = entry['results']
+        metrics = entry['metrics']
+        rows.append((
+            entry['filename'],
+            results.get('model_name', 'Unknown'),
+            results.get('dataset', 'Unknown'),
+            str(metrics['total_samples']) if metrics else '-',
+            f"{metrics['accuracy']}%" if metrics else 'n/a'
+        ))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write("ML Model Comparison Report\n")
+        f.write("=" * 60 + "\n\n")
+        for i, row in enumerate(rows):
+            f.write("  ".join(cell.ljust(w)
+                    for cell, w in zip(row, widths)).rstrip() + "\n")
+            if i == 0:
+                f.write("  ".join("-" * w for w in widths) + "\n")
+
+        for entry in evaluated:
+            results = entry['results']
+            f.write("\n" + "=" * 60 + "\n")
+            f.write(f"{results.get('model_name', 'Unknown')} "
+                    f"({entry['filename']})\n")
+            f.write("-" * 60 + "\n")
+            f.write((entry.get('evaluation') or "LLM analysis unavailable") + "\n")
+
+        if failed:
+            f.write("\n" + "=" * 60 + "\n")
+            f.write("Files that could not be evaluated:\n")
+            for entry in failed:
+                f.write(f"- {entry['filename']}: {entry['error']}\n")
+
+    return output_file
+
+
+def run_comparison(filenames):
+    """Evaluate many results files and write a combined comparison report"""
+    print(f"📁 Datasets: {len(filenames)}")
+
+    # Metrics are CPU bound, so compute them in a process pool
+    print("\n📊 Calculating metrics...")
+    with ProcessPoolExecutor() as pool:
+        entries = list(pool.map(evaluate_file, filenames))
+
+    for entry in entries:
+        if 'error' in entry:
+            print(f"❌ {entry['filename']}: {entry['error']}")
+
+    # Reuse analyses for files whose evaluation output is already current
+    cache = load_evaluation_cache()
+    pending = []
+    for entry in entries:
+        if 'error' in entry:
+            continue
+        cached = cache.get(entry['filename'])
+        if (cached and cached.get('key') == cache_key(entry)
+                and os.path.exists(evaluation_output_path(entry['filename']))):
+            entry['evaluation'] = cached['evaluation']
+            print(f"⏭️  {entry['filename']}: unchanged, using cached evaluation")
+        else:
+            pending.append(entry)
+
+    # LLM calls are I/O bound, so run them concurrently with a bounded limit
+    if pending:
+        print(f"\n📡 Requesting {len(pending)} LLM analyses "
+              f"(max {EVAL_MAX_CONCURRENCY} concurrent)...")
+        with ThreadPoolExecutor(max_workers=EVAL_MAX_CONCURRENCY) as pool:
+            evaluations = pool.map(
+                lambda e: call_openrouter_api(e['prompt']),
+                pending)
+            for entry, evaluation in zip(pending, evaluations):
+                entry['evaluation'] = evaluation
+                if not evaluation:
+                    continue
+                output_file = write_evaluation_file(
+                    entry['filename'], entry['results'], entry['metrics'], evaluation)
+                cache[entry['filename']] = {
+                    'key': cache_key(entry),
+                    'evaluation': evaluation
+                }
+                print(f"💾 {entry['filename']}: saved to {output_file}")
+        save_evaluation_cache(cache)
+
+    report_file = write_comparison_report(entries)
+    print(f"\n💾 Comparison report saved to: {report_file}")
+
+
 def main():
     """Main execution function"""
+    # Several files or a glob pattern switch to comparison mode
+    args = sys.argv[1:]
+    filenames = expand_dataset_args(args)
+    compare = len(args) > 1 or any(
+        any(ch in arg for ch in '*?[') for arg in args)
+
     # Get dataset filename from command line args, default to sample_results.json
-    filename = sys.argv[1] if len(sys.argv) > 1 else 'sample_results.json'
+    filename = filenames[0] if filenames else 'sample_results.json'
 
     print("=" * 60)
     print("🤖 ML Model Evaluation Demo")
@@ -110,6 +321,14 @@ def main():
 
     print(f"\n🔑 API Key: Configured")
     print(f"🤖 Model: Configured")
+
+    if compare:
+        if not filenames:
+            print("\n❌ Error: No dataset files matched")
+            return
+        run_comparison(filenames)
+        return
+
     print(f"📁 Dataset: {filename}")
 
     # Load sample results
@@ -131,16 +350,8 @@ def main():
         print(f"   Correct: {metrics['correct_predictions']}")
         print(f"   Accuracy: {metrics['accuracy']}%")
 
-    # Create evaluation prompt
-    prompt = """Given the following JSON containing model predictions and true labels, 
-please provide a detailed evaluation that includes:
-1. Calculate the accuracy
-2. Identify any patterns in misclassifications
-3. Provide insights on model performance
-4. Suggest potential improvements"""
-
     # Call API for LLM-powered evaluation
-    evaluation = call_openrouter_api(prompt, results)
+    evaluation = call_openrouter_api(build_prompt(results, metrics))
 
     if evaluation:
         print("\n" + "=" * 60)
@@ -150,19 +361,8 @@ please provide a detailed evaluation that includes:
         print("=" * 60)
 
         # Save evaluation to file with dataset-specific name
-        base_name = filename.replace('.json', '')
-        output_file = f'{base_name}_evaluation.txt'
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write("ML Model Evaluation Summary\n")
-            f.write("=" * 60 + "\n\n")
-            f.write(f"Model: {results.get('model_name', 'Unknown')}\n")
-            f.write(f"Dataset: {results.get('dataset', 'Unknown')}\n\n")
-            if metrics:
-                f.write(f"Accuracy: {metrics['accuracy']}%\n")
-                f.write(f"Total Samples: {metrics['total_samples']}\n\n")
-            f.write("LLM Analysis:\n")
-            f.write("-" * 60 + "\n")
-            f.write(evaluation)
+        output_file = write_evaluation_file(
+            filename, results, metrics, evaluation)
 
         print(f"\n💾 Evaluation saved to: {output_file}")
     else:
@@ -0,0 +1,159 @@
+"""
+ML Model Evaluation Demo - Prompt Builder
+Builds compact evaluation prompts whose size does not grow with the dataset
+
+Creator: Sabilashan Ganeshan
+GitHub: https://github.com/sabilashang
+"""
+
+import os
+from collections import Counter
+
+# Approximate token budget for the whole evaluation prompt
+EVAL_PROMPT_TOKEN_BUDGET = int(os.getenv('EVAL_PROMPT_TOKEN_BUDGET', '1500'))
+
+# Upper bound on misclassified examples considered for the prompt
+MAX_EXAMPLES = 50
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def label_name(results, label):
+    """Human readable class name, falling back to the raw label"""
+    return results.get('class_labels', {}).get(str(label), label)
+
+
+def confusion_counts(predictions, true_labels):
+    """Count (true label, predicted label) pairs in a single pass"""
+    return Counter(zip(true_labels, predictions))
+
+
+def sample_misclassified(predictions, true_labels, limit=MAX_EXAMPLES):
+    """Pick misclassified sample indices, stratified by error type
+
+    Each (true, predicted) pair gets a fair share of the examples, spread
+    evenly across the file so the sample is deterministic and representative.
+    """
+    strata = {}
+    for i, (pred, true) in enumerate(zip(predictions, true_labels)):
+        if pred != true:
+            strata.setdefault((true, pred), []).append(i)
+
+    # Hand out slots round-robin so small error types are not crowded out
+    quotas = dict.fromkeys(strata, 0)
+    remaining = min(limit, sum(len(v) for v in strata.values()))
+    while remaining > 0:
+        for key, indices in strata.items():
+            if remaining > 0 and quotas[key] < len(indices):
+                quotas[key] += 1
+                remaining -= 1
+
+    picks = {
+        key: [indices[j * len(indices) // quotas[key]]
+              for j in range(quotas[key])]
+        for key, indices in strata.items() if quotas[key]
+    }
+
+    # Interleave strata so a budget cut keeps every error type represented
+    sampled = []
+    for j in range(max((len(v) for v in picks.values()), default=0)):
+        for indices in picks.values():
+            if j < len(indices):
+                sampled.append(indices[j])
+    return sampled
+
+
+def sample_fields(results, index):
+    """Per-sample fields of one sample (attributes and feature values), or ''"""
+    fields = []
+    for name, values in (results.get('attributes') or {}).items():
+        if index < len(values):
+            fields.append(f"{name}={values[index]}")
+
+    # Optional per-sample feature values, aligned with feature_names
+    features = results.get('features') or []
+    if index < len(features):
+        names = results.get('feature_names') or []
+        fields += [f"{names[j] if j < len(names) else f'feature{j}'}={value}"
+                   for j, value in enumerate(features[index])]
+    return ', '.join(fields)
+
+
+def build_evaluation_prompt(instructions, results, metrics=None, token_budget=None):
+    """Build an evaluation prompt from metrics, confusion matrix and sampled errors
+
+    `metrics` maps display names to already formatted values. The confusion
+    matrix (diagonal first, then the largest off-diagonal cells) and the
+    misclassified examples are added until the prompt reaches `token_budget`.
+    Examples are only listed when the file has per-sample fields to show.
+    """
+    if token_budget is None:
+        token_budget = EVAL_PROMPT_TOKEN_BUDGET
+
+    predictions = results.get('predictions', [])
+    true_labels = results.get('true_labels', [])
+
+    lines = [
+        instructions,
+        "",
+        f"Model: {results.get('model_name', 'Unknown')}",
+        f"Dataset: {results.get('dataset', 'Unknown')}",
+        f"Total Samples: {len(predictions)}"
+    ]
+    if results.get('notes'):
+        lines.append(f"Notes: {str(results['notes'])[:500]}")
+
+    if metrics:
+        lines += ["", "Metrics:"]
+        lines += [f"- {name}: {value}" for name, value in metrics.items()]
+
+    closing = "\n\nProvide a comprehensive evaluation summary."
+    # Room for the section headings and the omitted-cells note
+    used = estimate_tokens("\n".join(lines) + closing) + 40
+
+    # Confusion matrix: correct cells first, then the most frequent errors
+    counts = confusion_counts(predictions, true_labels)
+    diagonal = sorted(((k, c) for k, c in counts.items() if k[0] == k[1]),
+                      key=lambda kv: str(kv[0]))
+    off_diagonal = sorted(((k, c) for k, c in counts.items() if k[0] != k[1]),
+                          key=lambda kv: kv[1], reverse=True)
+    # Leave a third of the remaining budget for examples when there are any
+    has_fields = bool(results.get('attributes') or results.get('features'))
+    matrix_budget = token_budget - (token_budget - used) // 3 if has_fields else token_budget
+    cells = []
+    for (true, pred), count in diagonal + off_diagonal:
+        line = f"- {label_name(results, true)} -> {label_name(results, pred)}: {count}"
+        cost = estimate_tokens(line)
+        if used + cost > matrix_budget:
+            break
+        cells.append(line)
+        used += cost
+
+    lines += ["", "Confusion Matrix (true -> predicted: count):"] + cells
+    if len(cells) < len(counts):
+        lines.append(f"- ({len(counts) - len(cells)} less frequent cells omitted)")
+
+    total_errors = sum(c for (true, pred), c in counts.items() if true != pred)
+    prompt = "\n".join(lines)
+
+    examples = []
+    for i in sample_misclassified(predictions, true_labels):
+        fields = sample_fields(results, i)
+        if not fields:
+            break
+        line = (f"- true={label_name(results, true_labels[i])}, "
+                f"predicted={label_name(results, predictions[i])}: {fields}")
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            break
+        examples.append(line)
+        used += cost
+
+    if examples:
+        prompt += (f"\n\nMisclassified examples ({len(examples)} of {total_errors}, "
+                   f"stratified by error type):\n" + "\n".join(examples))
+
+    return prompt + closing
@@ -7,9 +7,18 @@ GitHub: https://github.com/sabilashang
 """
 
 import os
+import re
+import sys
 import json
+import math
+import random
+import struct
+import sqlite3
+import hashlib
+import threading
 import requests
-from flask import Flask, render_template, request, jsonify
+from collections import Counter
+from flask import Blueprint, Flask, render_template, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 
@@ -18,18 +27,277 @@ from dotenv import load_dotenv
 env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 load_dotenv(dotenv_path=env_path)
 
-app = Flask(__name__)
-CORS(app)
+# Hedged requests are shared with the evaluator (llm_hedging.py in the repo root)
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from llm_hedging import get_hedge_stats, post_with_hedging  # noqa: E402
+
+# Routes live on a blueprint so serve.py can mount this app alongside the others
+bp = Blueprint('summarizer', __name__, template_folder='templates',
+               static_folder='static', static_url_path='/static')
 
 # OpenRouter API Configuration - All values from .env only
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
 OPENROUTER_API_URL = os.getenv('OPENROUTER_API_URL')
 DEFAULT_MODEL = os.getenv('DEFAULT_MODEL')
 
+# Near-duplicate summary reuse - each input gets a MinHash signature of its
+# 2-word shingles (numbers normalized, so a template note with a new date or
+# new figures is still a near duplicate). Signatures are indexed in SQLite with
+# LSH: MINHASH_BANDS bands of MINHASH_ROWS values each, both derived from
+# NEAR_DUP_THRESHOLD. Inputs above the threshold share a band with near
+# certainty, while unrelated inputs almost never do, so a lookup only reads a
+# handful of candidates. Set NEAR_DUP_THRESHOLD=0 to disable.
+NEAR_DUP_DB = os.getenv('NEAR_DUP_DB', os.path.join(
+    os.path.dirname(__file__), 'near_dup_index.sqlite3'))
+NEAR_DUP_THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD', '0.7'))
+MINHASH_PERMUTATIONS = 128
+MINHASH_PRIME = (1 << 61) - 1
+SHINGLE_SIZE = 2
+
+near_dup_local = threading.local()
+
+# Fixed seed, so signatures stay comparable across processes and restarts
+_minhash_random = random.Random(20240601)
+MINHASH_COEFFICIENTS = [
+    (_minhash_random.randrange(1, MINHASH_PRIME), _minhash_random.randrange(MINHASH_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)]
+
+# Local extractive summarization - long inputs are cut to the highest scoring
+# sentences before the LLM call, and the 'extractive' summary type answers
+# without calling the API. Set EXTRACTIVE_TOKEN_BUDGET=0 to always send the full text.
+EXTRACTIVE_TOKEN_BUDGET = int(os.getenv('EXTRACTIVE_TOKEN_BUDGET', '1000'))
+EXTRACTIVE_SUMMARY_SENTENCES = 3
+
+
+def lsh_params(threshold, permutations, recall_weight=0.8, steps=100):
+    """LSH (bands, rows) minimizing missed near duplicates and extra candidates
+
+    Weighs the probability of missing an input above `threshold` against
+    that of reading one below it, integrated over the similarity range.
+    """
+    def area(f, low, high):
+        width = (high - low) / steps
+        return sum(f(low + (i + 0.5) * width) for i in range(steps)) * width
+
+    best = None
+    for bands in range(1, permutations + 1):
+        for rows in range(1, permutations // bands + 1):
+            def candidate(s):
+                return 1 - (1 - s ** rows) ** bands
+            error = ((1 - recall_weight) * area(candidate, 0, threshold)
+                     + recall_weight * area(lambda s: 1 - candidate(s), threshold, 1))
+            if best is None or error < best[0]:
+                best = (error, bands, rows)
+    return best[1], best[2]
+
+
+if NEAR_DUP_THRESHOLD > 0:
+    MINHASH_BANDS, MINHASH_ROWS = lsh_params(NEAR_DUP_THRESHOLD, MINHASH_PERMUTATIONS)
+else:
+    MINHASH_BANDS, MINHASH_ROWS = 1, 1
+
+
+def minhash(text):
+    """128-value MinHash signature of the text's word shingles, with numbers normalized"""
+    words = ['0' if w.isdigit() else w for w in re.findall(r'\w+', text.lower())]
+    hashes = {int.from_bytes(hashlib.blake2b(
+        ' '.join(words[i:i + SHINGLE_SIZE]).encode('utf-8'), digest_size=8).digest(), 'big')
+        for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+
+    return tuple(min((a * h + b) % MINHASH_PRIME for h in hashes) & 0xffffffff
+                 for a, b in MINHASH_COEFFICIENTS)
+
+
+def minhash_bands(signature):
+    """One 64-bit key per LSH band (MINHASH_ROWS signature values each)"""
+    return [int.from_bytes(hashlib.blake2b(
+        struct.pack(f'<{MINHASH_ROWS}I', *signature[i * MINHASH_ROWS:(i + 1) * MINHASH_ROWS]),
+        digest_size=8).digest(), 'big', signed=True)
+        for i in range(MINHASH_BANDS)]
+
+
+def near_dup_db():
+    """Per-thread SQLite connection to the near-duplicate index
+
+    The band table is rebuilt from the stored signatures whenever the LSH
+    layout (recorded as the database's user_version) no longer matches the
+    configured threshold.
+    """
+    conn = getattr(near_dup_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(NEAR_DUP_DB, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''CREATE TABLE IF NOT EXISTS minhash_summaries (
+            id INTEGER PRIMARY KEY, model TEXT, summary_type TEXT,
+            signature BLOB, summary TEXT)''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS minhash_bands (
+            band INTEGER, value INTEGER, summary_id INTEGER,
+            PRIMARY KEY (band, value, summary_id)) WITHOUT ROWID''')
+        conn.commit()
+
+        layout = MINHASH_BANDS * 1000 + MINHASH_ROWS
+        if conn.execute('PRAGMA user_version').fetchone()[0] != layout:
+            conn.execute('BEGIN IMMEDIATE')
+            # Another worker may have rebuilt the bands while we waited for the lock
+            if conn.execute('PRAGMA user_version').fetchone()[0] != layout:
+                conn.execute('DELETE FROM minhash_bands')
+                conn.executemany(
+                    'INSERT INTO minhash_bands (band, value, summary_id) VALUES (?, ?, ?)',
+                    [(band, value, summary_id)
+                     for summary_id, stored in conn.execute('SELECT id, signature FROM minhash_summaries')
+                     for band, value in enumerate(minhash_bands(unpack_signature(stored)))])
+                conn.execute(f'PRAGMA user_version = {layout}')
+            conn.commit()
+        near_dup_local.conn = conn
+    return conn
+
+
+def pack_signature(signature):
+    """Signature as a compact BLOB (4 bytes per value)"""
+    return struct.pack(f'<{MINHASH_PERMUTATIONS}I', *signature)
+
+
+def unpack_signature(blob):
+    """Signature tuple from its stored BLOB"""
+    return struct.unpack(f'<{MINHASH_PERMUTATIONS}I', blob)
+
+
+def near_duplicate_candidates(signature, summary_type):
+    """Stored (signature, summary) rows sharing at least one LSH band with `signature`"""
+    bands = list(enumerate(minhash_bands(signature)))
+    where = ' OR '.join(['(band = ? AND value = ?)'] * len(bands))
+    return near_dup_db().execute(
+        'SELECT signature, summary FROM minhash_summaries WHERE id IN '
+        f'(SELECT summary_id FROM minhash_bands WHERE {where}) '
+        'AND model IS ? AND summary_type = ?',
+        (*(x for band in bands for x in band), DEFAULT_MODEL, summary_type)).fetchall()
+
+
+def find_near_duplicate(signature, summary_type):
+    """Return (summary, similarity) of the closest stored input above the threshold, or None
+
+    Similarity is the estimated Jaccard similarity of the two shingle sets.
+    """
+    best = None
+    for stored, summary in near_duplicate_candidates(signature, summary_type):
+        similarity = sum(a == b for a, b in zip(signature, unpack_signature(stored))) / MINHASH_PERMUTATIONS
+        if similarity >= NEAR_DUP_THRESHOLD and (not best or similarity > best[1]):
+            best = (summary, similarity)
+    return best
+
+
+def store_near_duplicate(signature, summary_type, summary):
+    """Add a fresh summary to the near-duplicate index"""
+    conn = near_dup_db()
+    summary_id = conn.execute(
+        'INSERT INTO minhash_summaries (model, summary_type, signature, summary) '
+        'VALUES (?, ?, ?, ?)',
+        (DEFAULT_MODEL, summary_type, pack_signature(signature), summary)).lastrowid
+    conn.executemany(
+        'INSERT INTO minhash_bands (band, value, summary_id) VALUES (?, ?, ?)',
+        [(band, value, summary_id) for band, value in enumerate(minhash_bands(signature))])
+    conn.commit()
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def split_sentences(text):
+    """Split text into sentences on end punctuation and line breaks"""
+    parts = re.split(r'(?<=[.!?])\s+|\n+', text)
+    return [part.strip() for part in parts if part.strip()]
+
+
+def score_sentences(sentences):
+    """Score sentences by TF-IDF cosine similarity to the whole text
+
+    Each sentence is a sparse term vector (term -> weight), so the cost is
+    linear in the number of words.
+    """
+    rows = [Counter(w for w in re.findall(r'\w+', s.lower()) if len(w) > 2)
+            for s in sentences]
+    document_frequency = Counter(term for row in rows for term in row)
+    n = len(rows)
+
+    vectors = []
+    centroid = Counter()
+    for row in rows:
+        total = sum(row.values()) or 1
+        vector = {term: count / total * (math.log((1 + n) / (1 + document_frequency[term])) + 1)
+                  for term, count in row.items()}
+        vectors.append(vector)
+        centroid.update(vector)
+
+    centroid_norm = math.sqrt(sum(w * w for w in centroid.values())) or 1
+    scores = []
+    for vector in vectors:
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1
+        dot = sum(w * centroid[term] for term, w in vector.items())
+        scores.append(dot / (norm * centroid_norm))
+    return scores
+
+
+def select_sentences(sentences, token_budget=None, max_sentences=None):
+    """Pick the highest scoring sentences, in original order, within the limits"""
+    scores = score_sentences(sentences)
+    ranked = sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)
+
+    picked = []
+    used = 0
+    for i in ranked:
+        if max_sentences and len(picked) >= max_sentences:
+            break
+        cost = estimate_tokens(sentences[i])
+        if token_budget and used + cost > token_budget:
+            continue
+        picked.append(i)
+        used += cost
+
+    # Always keep at least the best sentence, trimmed to the budget if needed
+    if not picked:
+        best = sentences[ranked[0]]
+        return [best[:token_budget * 4] if token_budget else best]
+
+    return [sentences[i] for i in sorted(picked)]
+
+
+def extract_sentences(text, token_budget):
+    """Cut text down to its key sentences when it is over the token budget"""
+    sentences = split_sentences(text)
+    if estimate_tokens(text) <= token_budget or not sentences:
+        return text
+    return '\n'.join(select_sentences(sentences, token_budget=token_budget))
+
+
+def extractive_summary(text):
+    """Summarize locally by picking the key sentences (no API call)"""
+    sentences = select_sentences(
+        split_sentences(text), max_sentences=EXTRACTIVE_SUMMARY_SENTENCES)
+    summary = '\n'.join(f'• {sentence}' for sentence in sentences)
+
+    return {
+        'success': True,
+        'summary': summary,
+        'original_length': len(text),
+        'summary_length': len(summary),
+        'summary_type': 'extractive',
+        'approximate': False
+    }
+
 
 def call_openrouter_api(text, summary_type='concise'):
     """Call OpenRouter API to summarize text"""
     try:
+        original_length = len(text)
+
+        # Cut long inputs down to their key sentences to save tokens
+        if EXTRACTIVE_TOKEN_BUDGET > 0:
+            text = extract_sentences(text, EXTRACTIVE_TOKEN_BUDGET)
+
         # Customize prompt based on summary type
         prompts = {
             'concise': f"Summarize the following text in 3 concise bullet points:\n\n{text}",
@@ -54,8 +322,7 @@ def call_openrouter_api(text, summary_type='concise'):
             ]
         }
 
-        response = requests.post(
-            OPENROUTER_API_URL, headers=headers, json=payload, timeout=60)
+        response = post_with_hedging(OPENROUTER_API_URL, headers, payload)
 
         # Check for errors and provide detailed error message
         if not response.ok:
@@ -81,7 +348,8 @@ def call_openrouter_api(text, summary_type='concise'):
         return {
             'success': True,
             'summary': summary,
-            'original_length': len(text),
+            'original_length': original_length,
+            'prompt_text_length': len(text),
             'summary_length': len(summary),
             'summary_type': summary_type
         }
@@ -98,23 +366,16 @@ def call_openrouter_api(text, summary_type='concise'):
         }
 
 
-@app.route('/')
+@bp.route('/')
 def index():
     """Main page with text input form"""
-    return render_template('index.html')
+    return render_template('summarizer/index.html')
 
 
-@app.route('/summarize', methods=['POST'])
+@bp.route('/summarize', methods=['POST'])
 def summarize():
     """Summarize endpoint - receives text and returns summary"""
 
-    # Check API key
-    if not OPENROUTER_API_KEY or OPENROUTER_API_KEY == 'your_openrouter_api_key_here':
-        return jsonify({
-            'success': False,
-            'error': 'API key not configured. Please set OPENROUTER_API_KEY in .env file'
-        }), 500
-
     # Get data from request
     data = request.get_json()
 
@@ -146,16 +407,52 @@ def summarize():
             'error': 'Text too long. Maximum 10,000 characters allowed.'
         }), 400
 
+    # Extractive summaries are computed locally and need no API key
+    if summary_type == 'extractive':
+        return jsonify(extractive_summary(text)), 200
+
+    # Check API key
+    if not OPENROUTER_API_KEY or OPENROUTER_API_KEY == 'your_openrouter_api_key_here':
+        return jsonify({
+            'success': False,
+            'error': 'API key not configured. Please set OPENROUTER_API_KEY in .env file'
+        }), 500
+
+    # Reuse the summary of a near-identical earlier input when there is one
+    signature = minhash(text) if NEAR_DUP_THRESHOLD > 0 else None
+    if signature is not None:
+        try:
+            match = find_near_duplicate(signature, summary_type)
+        except sqlite3.Error:
+            match = None
+        if match:
+            summary, similarity = match
+            return jsonify({
+                'success': True,
+                'summary': summary,
+                'original_length': len(text),
+                'summary_length': len(summary),
+                'summary_type': summary_type,
+                'approximate': True,
+                'similarity': round(similarity, 4)
+            }), 200
+
     # Call API to generate summary
     result = call_openrouter_api(text, summary_type)
 
     if result['success']:
+        result['approximate'] = False
+        if signature is not None:
+            try:
+                store_near_duplicate(signature, summary_type, result['summary'])
+            except sqlite3.Error:
+                pass
         return jsonify(result), 200
     else:
         return jsonify(result), 500
 
 
-@app.route('/api/info')
+@bp.route('/api/info')
 def api_info():
     """API information endpoint"""
     return jsonify({
@@ -163,20 +460,28 @@ def api_info():
         'version': '1.0.0',
         'model': DEFAULT_MODEL,
         'api_configured': bool(OPENROUTER_API_KEY and OPENROUTER_API_KEY != 'your_openrouter_api_key_here'),
+        'hedging': get_hedge_stats(),
         'endpoints': {
             '/': 'GET - Main application page',
             '/summarize': 'POST - Summarize text (JSON: {text, summary_type})',
-            '/api/info': 'GET - API information'
+            '/api/info': 'GET - API information and hedging stats'
         },
         'summary_types': [
             'concise - 3 bullet points',
             'detailed - Comprehensive summary',
             'keywords - Key concepts extraction',
-            'tldr - One sentence summary'
+            'tldr - One sentence summary',
+            'extractive - Key sentences picked locally (no API call)'
         ]
     })
 
 
+# Standalone app (python main.py)
+app = Flask(__name__, static_folder=None)
+CORS(app)
+app.register_blueprint(bp)
+
+
 if __name__ == '__main__':
     print("=" * 60)
     print("📝 Note Summarizer App")
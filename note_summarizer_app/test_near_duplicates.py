@@ -0,0 +1,93 @@
+"""
+Note Summarizer App - Near-Duplicate Check
+Verifies that template notes are reused at the default NEAR_DUP_THRESHOLD
+
+Creator: Sabilashan Ganeshan
+GitHub: https://github.com/sabilashang
+
+Usage:
+    python -m unittest test_near_duplicates
+"""
+
+import os
+import time
+import tempfile
+import unittest
+
+# Use a throwaway index instead of near_dup_index.sqlite3
+os.environ['NEAR_DUP_DB'] = os.path.join(tempfile.mkdtemp(), 'near_dup_index.sqlite3')
+
+import main  # noqa: E402
+
+STANDUP_NOTE = (
+    "Team standup on {date}. Backend finished the login API and frontend is "
+    "wiring the settings page. Blockers: staging database is slow. Next: deploy "
+    "the release candidate on Friday."
+)
+INCIDENT_NOTE = (
+    "Incident report {date}. The payment service returned errors for twelve "
+    "minutes after a config change. Rolled back, added an alert, and scheduled "
+    "a postmortem review."
+)
+
+
+class NearDuplicateTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        signature = main.minhash(STANDUP_NOTE.format(date='March 3, 2024'))
+        main.store_near_duplicate(signature, 'concise', 'Standup summary')
+
+    def test_changed_date_is_reused(self):
+        note = STANDUP_NOTE.format(date='October 21, 2025')
+        match = main.find_near_duplicate(main.minhash(note), 'concise')
+        self.assertIsNotNone(match)
+        self.assertEqual(match[0], 'Standup summary')
+
+    def test_other_note_is_not_reused(self):
+        note = INCIDENT_NOTE.format(date='March 3, 2024')
+        self.assertIsNone(main.find_near_duplicate(main.minhash(note), 'concise'))
+
+    def test_other_summary_type_is_not_reused(self):
+        note = STANDUP_NOTE.format(date='March 3, 2024')
+        self.assertIsNone(main.find_near_duplicate(main.minhash(note), 'detailed'))
+
+
+class LargeIndexTest(unittest.TestCase):
+    """Lookups stay selective when the index holds many unrelated inputs"""
+
+    INDEX_SIZE = 20000
+
+    @classmethod
+    def setUpClass(cls):
+        conn = main.near_dup_db()
+        bands = []
+        for _ in range(cls.INDEX_SIZE):
+            signature = main.unpack_signature(os.urandom(4 * main.MINHASH_PERMUTATIONS))
+            summary_id = conn.execute(
+                'INSERT INTO minhash_summaries (model, summary_type, signature, summary) '
+                'VALUES (?, ?, ?, ?)',
+                (main.DEFAULT_MODEL, 'bullet', main.pack_signature(signature), 'Other summary')).lastrowid
+            bands += [(band, value, summary_id)
+                      for band, value in enumerate(main.minhash_bands(signature))]
+        conn.executemany(
+            'INSERT INTO minhash_bands (band, value, summary_id) VALUES (?, ?, ?)', bands)
+        conn.commit()
+        main.store_near_duplicate(
+            main.minhash(STANDUP_NOTE.format(date='March 3, 2024')), 'bullet', 'Standup summary')
+
+    def test_only_the_near_duplicate_is_a_candidate(self):
+        signature = main.minhash(STANDUP_NOTE.format(date='October 21, 2025'))
+        start = time.monotonic()
+        candidates = main.near_duplicate_candidates(signature, 'bullet')
+        elapsed = time.monotonic() - start
+        self.assertEqual([summary for _, summary in candidates], ['Standup summary'])
+        self.assertLess(elapsed, 0.05)
+
+    def test_unrelated_note_has_no_candidates(self):
+        signature = main.minhash(INCIDENT_NOTE.format(date='March 3, 2024'))
+        self.assertEqual(main.near_duplicate_candidates(signature, 'bullet'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
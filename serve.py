@@ -0,0 +1,179 @@
+"""
+Production Server - All Python Demos in One App
+Mounts the note summarizer, data cleaner and model evaluator as blueprints
+and serves them with gunicorn (several worker processes, each multi-threaded)
+
+Creator: Sabilashan Ganeshan
+GitHub: https://github.com/sabilashang
+
+Usage:
+    python serve.py
+
+The app is created once in the master process (config and templates included)
+and then forked, so workers share that memory copy-on-write.
+"""
+
+import os
+import sys
+import gc
+import time
+import signal
+import multiprocessing
+from flask import Flask, jsonify
+from flask_cors import CORS
+from dotenv import load_dotenv
+from gunicorn.app.base import BaseApplication
+
+# Load environment variables once for every demo
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(dotenv_path=os.path.join(ROOT_DIR, '.env'))
+
+# The evaluator imports its prompt builder as a top-level module
+sys.path.insert(0, os.path.join(ROOT_DIR, 'ml_model_eval_demo'))
+
+from note_summarizer_app import main as summarizer  # noqa: E402
+from ml_data_cleaning_demo import app as cleaner  # noqa: E402
+from ml_model_eval_demo import app as evaluator  # noqa: E402
+
+# Server configuration - override via .env or the environment
+WEB_BIND = os.getenv('WEB_BIND', '0.0.0.0:8080')
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+WEB_THREADS = int(os.getenv('WEB_THREADS', '8'))
+WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', '120'))  # above the 60s LLM timeout
+# Long enough for an LLM call and its hedge (2 x 60s) to finish on shutdown
+WEB_GRACEFUL_TIMEOUT = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '150'))
+# Seconds /ready reports 503 on SIGTERM while requests are still accepted,
+# so load balancers take the server out of rotation before it stops listening
+WEB_DRAIN_SECONDS = int(os.getenv('WEB_DRAIN_SECONDS', '10'))
+
+# URL prefix for each mounted demo
+SERVICES = {
+    '/summarizer': summarizer.bp,
+    '/cleaner': cleaner.bp,
+    '/evaluator': evaluator.bp
+}
+
+# Set by the master on SIGTERM, so /ready reports 503 in every worker.
+# Created before the fork, so the workers share this memory with the master.
+draining = multiprocessing.RawValue('b', 0)
+
+
+def create_app():
+    """Build the combined app and preload its templates"""
+    app = Flask(__name__, static_folder=None)
+    CORS(app)
+    app.config['UPLOAD_FOLDER'] = cleaner.UPLOAD_FOLDER
+    app.config['MAX_CONTENT_LENGTH'] = cleaner.MAX_CONTENT_LENGTH
+
+    for prefix, blueprint in SERVICES.items():
+        app.register_blueprint(blueprint, url_prefix=prefix)
+
+    # Compile every template up front so the forked workers share them
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+    @app.route('/')
+    def index():
+        """List the mounted demos"""
+        return jsonify({
+            'services': {bp.name: f'{prefix}/' for prefix, bp in SERVICES.items()}
+        })
+
+    @app.route('/ready')
+    def ready():
+        """Readiness endpoint for load balancers"""
+        if draining.value:
+            return jsonify({'ready': False, 'reason': 'shutting down'}), 503
+        return jsonify({
+            'ready': True,
+            'services': [bp.name for bp in SERVICES.values()],
+            'api_configured': bool(summarizer.OPENROUTER_API_KEY and summarizer.OPENROUTER_API_KEY != 'your_openrouter_api_key_here')
+        })
+
+    return app
+
+
+app = create_app()
+
+
+def when_ready(server):
+    """Freeze preloaded objects and drain before the master shuts down
+
+    Gunicorn closes the listening sockets as soon as the master handles
+    SIGTERM. Marking the server as draining first, and keeping it serving for
+    WEB_DRAIN_SECONDS, lets readiness probes see the 503 and stop routing
+    traffic here before connections are refused.
+    """
+    gc.freeze()
+    handle_term = server.handle_term
+
+    def drain_and_term():
+        draining.value = 1
+        server.log.info("Draining for %s seconds before shutdown", WEB_DRAIN_SECONDS)
+        time.sleep(WEB_DRAIN_SECONDS)
+        handle_term()
+
+    server.handle_term = drain_and_term
+
+
+def post_worker_init(worker):
+    """Remember when the worker receives SIGTERM, to budget its shutdown"""
+    handle_exit = worker.handle_exit
+
+    def drain_and_exit(sig, frame):
+        worker.drain_started = time.monotonic()
+        handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, drain_and_exit)
+
+
+def worker_exit(server, worker):
+    """Let background LLM analyses finish before gunicorn kills the worker
+
+    Whatever is still running shortly before the graceful timeout is marked
+    as failed instead of staying pending on disk.
+    """
+    started = getattr(worker, 'drain_started', time.monotonic())
+    remaining = WEB_GRACEFUL_TIMEOUT - (time.monotonic() - started) - 5
+    evaluator.finish_analyses(max(0, remaining))
+
+
+class ProductionServer(BaseApplication):
+    """Gunicorn application serving the preloaded combined app"""
+
+    def __init__(self, application, options):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("🚀 Prompt Engineering Demos - Production Server")
+    print("=" * 60)
+    print(f"\n🌐 Listening on http://{WEB_BIND}")
+    print(f"👷 Workers: {WEB_WORKERS} x {WEB_THREADS} threads")
+    for prefix, blueprint in SERVICES.items():
+        print(f"   - {blueprint.name}: {prefix}/")
+    print("   - readiness: /ready\n")
+    print("=" * 60 + "\n")
+
+    ProductionServer(app, {
+        'bind': WEB_BIND,
+        'workers': WEB_WORKERS,
+        'threads': WEB_THREADS,
+        'worker_class': 'gthread',
+        'timeout': WEB_TIMEOUT,
+        'graceful_timeout': WEB_GRACEFUL_TIMEOUT,
+        'preload_app': True,
+        'when_ready': when_ready,
+        'post_worker_init': post_worker_init,
+        'worker_exit': worker_exit
+    }).run()
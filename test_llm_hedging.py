@@ -0,0 +1,117 @@
+"""
+LLM Hedged Requests - Check
+Verifies when hedges fire, which request wins and what is counted
+
+Creator: Sabilashan Ganeshan
+GitHub: https://github.com/sabilashang
+
+Usage:
+    python -m unittest test_llm_hedging
+"""
+
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+import llm_hedging
+
+
+class FakeResponse:
+    """Stand-in for requests.Response"""
+
+    def __init__(self, status_code, model):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.model = model
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeUpstream:
+    """Replacement for timed_post: answers each model after a delay with a status"""
+
+    def __init__(self, **replies):
+        self.replies = replies  # model -> (delay, status_code)
+        self.calls = []
+
+    def __call__(self, url, headers, payload, adapter):
+        adapter.started = time.monotonic()
+        self.calls.append(payload['model'])
+        delay, status_code = self.replies[payload['model']]
+        while time.monotonic() - adapter.started < delay:
+            if adapter.aborted:
+                raise requests.exceptions.ConnectionError('Request aborted')
+            time.sleep(0.005)
+        return FakeResponse(status_code, payload['model']), time.monotonic() - adapter.started
+
+
+class HedgingTest(unittest.TestCase):
+
+    def setUp(self):
+        llm_hedging.hedge_latencies.clear()
+        llm_hedging.hedge_stats.update(requests=0, hedges=0, primary_wins=0, hedge_wins=0)
+        patcher = mock.patch.multiple(
+            llm_hedging, LLM_HEDGE_DELAY=0.05, LLM_HEDGE_MAX_RATE=1,
+            FALLBACK_MODELS=['fallback'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, upstream):
+        with mock.patch.object(llm_hedging, 'timed_post', upstream):
+            start = time.monotonic()
+            response = llm_hedging.post_with_hedging('http://llm', {}, {'model': 'primary'})
+            return response, time.monotonic() - start
+
+    def test_fast_primary_wins_and_is_counted(self):
+        response, _ = self.post(FakeUpstream(primary=(0, 200)))
+        self.assertEqual(response.model, 'primary')
+        self.assertEqual(llm_hedging.get_hedge_stats()['primary_wins'], 1)
+        self.assertEqual(llm_hedging.get_hedge_stats()['hedges'], 0)
+        self.assertEqual(len(llm_hedging.hedge_latencies), 1)
+
+    def test_slow_primary_is_hedged_and_aborted(self):
+        upstream = FakeUpstream(primary=(5, 200), fallback=(0, 200))
+        response, elapsed = self.post(upstream)
+        self.assertEqual(response.model, 'fallback')
+        self.assertLess(elapsed, 1)
+        stats = llm_hedging.get_hedge_stats()
+        self.assertEqual((stats['requests'], stats['hedges'], stats['hedge_wins']), (1, 1, 1))
+        # The aborted primary counts with the time it ran as a lower bound
+        self.assertEqual(len(llm_hedging.hedge_latencies), 1)
+        self.assertGreaterEqual(llm_hedging.hedge_latencies[0], 0.05)
+
+    def test_primary_server_error_is_hedged_at_once(self):
+        with mock.patch.object(llm_hedging, 'LLM_HEDGE_DELAY', 10):
+            response, elapsed = self.post(FakeUpstream(primary=(0, 503), fallback=(0, 200)))
+        self.assertEqual(response.model, 'fallback')
+        self.assertLess(elapsed, 1)
+        self.assertEqual(llm_hedging.get_hedge_stats()['hedge_wins'], 1)
+        # Failed responses do not count as latencies
+        self.assertEqual(len(llm_hedging.hedge_latencies), 0)
+
+    def test_client_error_is_not_hedged(self):
+        upstream = FakeUpstream(primary=(0, 400), fallback=(0, 200))
+        response, _ = self.post(upstream)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(upstream.calls, ['primary'])
+        self.assertEqual(llm_hedging.get_hedge_stats()['hedges'], 0)
+
+    def test_no_hedge_once_budget_is_used(self):
+        # One earlier hedge in two requests is the whole budget at a 0.5 rate
+        llm_hedging.hedge_stats.update(requests=1, hedges=1)
+        upstream = FakeUpstream(primary=(0.2, 200), fallback=(0, 200))
+        with mock.patch.object(llm_hedging, 'LLM_HEDGE_MAX_RATE', 0.5):
+            response, _ = self.post(upstream)
+        self.assertEqual(response.model, 'primary')
+        self.assertEqual(upstream.calls, ['primary'])
+        stats = llm_hedging.get_hedge_stats()
+        self.assertEqual((stats['requests'], stats['hedges'], stats['primary_wins']), (2, 1, 1))
+        self.assertEqual(stats['hedge_rate'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()